@@ -132,7 +132,7 @@ class EnhancedSupplyChainLLM:
         3. Proper aggregation
         """
         # Get all data for this category
-        category_data = self.db.data[self.db.data['Product type'] == category].copy()
+        category_data = self.db.get_product_data(category)
         
         if len(category_data) == 0:
             return None
@@ -146,14 +146,14 @@ class EnhancedSupplyChainLLM:
         unique_skus = category_data['SKU'].unique()
         num_skus = len(unique_skus)
         
+        # Latest (most recent) row of each SKU, in a single pass
+        latest_per_sku = category_data.drop_duplicates('SKU', keep='last').set_index('SKU').loc[unique_skus]
+        
         # CORRECT REVENUE CALCULATION
         # Revenue is per SKU (not per day), so we take the latest value for each SKU
         revenue_per_sku = {}
-        for sku in unique_skus:
-            sku_data = category_data[category_data['SKU'] == sku]
-            if 'Revenue generated' in sku_data.columns:
-                # Take the LAST (most recent) revenue value for this SKU
-                revenue_per_sku[sku] = sku_data['Revenue generated'].iloc[-1]
+        if 'Revenue generated' in latest_per_sku.columns:
+            revenue_per_sku = latest_per_sku['Revenue generated'].to_dict()
         
         total_revenue = sum(revenue_per_sku.values()) if revenue_per_sku else 0
         
@@ -168,10 +168,7 @@ class EnhancedSupplyChainLLM:
         category_daily_avg = total_sales / days_in_period if days_in_period > 0 else 0
         
         # Current stock (sum across all SKUs, latest values)
-        current_stock_per_sku = {}
-        for sku in unique_skus:
-            sku_data = category_data[category_data['SKU'] == sku]
-            current_stock_per_sku[sku] = sku_data['current_stock_level'].iloc[-1]
+        current_stock_per_sku = latest_per_sku['current_stock_level'].to_dict()
         
         total_current_stock = sum(current_stock_per_sku.values())
         
@@ -420,16 +417,18 @@ class EnhancedSupplyChainLLM:
         response = f"⚠️ **ANOMALIES DETECTED - {category}**\n\n"
         response += f"• Total anomalies: {len(anomalies)} (across ALL SKUs)\n"
         
-        critical = anomalies[anomalies['severity'] == 'critical']
-        danger = anomalies[anomalies['severity'] == 'danger']
-        warning = anomalies[anomalies['severity'] == 'warning']
+        # Count every severity in one pass
+        severity_counts = anomalies['severity'].value_counts()
+        critical = severity_counts.get('critical', 0)
+        danger = severity_counts.get('danger', 0)
+        warning = severity_counts.get('warning', 0)
         
-        if len(critical) > 0:
-            response += f"• 🔴 Stockouts: {len(critical)} occurrences\n"
-        if len(danger) > 0:
-            response += f"• 🟠 Critical levels: {len(danger)} occurrences\n"
-        if len(warning) > 0:
-            response += f"• 🟡 Overstocks: {len(warning)} occurrences\n"
+        if critical > 0:
+            response += f"• 🔴 Stockouts: {critical} occurrences\n"
+        if danger > 0:
+            response += f"• 🟠 Critical levels: {danger} occurrences\n"
+        if warning > 0:
+            response += f"• 🟡 Overstocks: {warning} occurrences\n"
         
         # Show latest anomaly
         if len(anomalies) > 0:
@@ -446,7 +445,8 @@ class EnhancedSupplyChainLLM:
         """Generate forecast."""
         horizon = params.get('period', 14)
         
-        forecast = self.analysis.forecast_demand(category, horizon=horizon, method='simple')
+        forecast, _ = self.analysis.unpack_forecast(
+            self.analysis.forecast_demand(category, horizon=horizon, method='simple'))
         
         if forecast is None:
             return f"❌ Unable to generate forecast for {category}"
@@ -2,8 +2,18 @@
 Script d'initialisation de la base de données
 """
 import pandas as pd
+import numpy as np
 from pathlib import Path
 from datetime import timedelta, datetime
+from pandas.tseries.api import guess_datetime_format
+
+# Imports optionnels
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 # Configuration du chemin - MODIFIEZ CETTE LIGNE avec le vrai chemin de votre CSV
 SCRIPT_DIR = Path(__file__).parent
@@ -37,13 +47,193 @@ def find_csv_file():
 # Chemin par défaut
 CSV_FILE_PATH = find_csv_file()
 
+# Nombre de lignes lues par bloc lors du chargement du CSV (lecteur pandas)
+CSV_CHUNKSIZE = 500_000
+
+# Taille en octets des blocs lus par le lecteur pyarrow
+CSV_BLOCK_SIZE = 64 << 20
+
+# Version du cache Parquet : à incrémenter à chaque modification de DTYPES
+# ou de _clean_chunk, pour ne pas recharger un cache écrit par un ancien chargeur
+CACHE_VERSION = 2
+
+# Colonnes indispensables au fonctionnement de l'agent
+REQUIRED_COLS = frozenset({'Product type', 'date', 'current_stock_level', 'daily_sold_units'})
+
+# Types des colonnes principales (lecture en une passe, mémoire réduite)
+DTYPES = {
+    'Product type': 'category',
+    'weather_condition': 'category',
+    'Supplier name': 'category',
+    'Location': 'category',
+    'current_stock_level': 'float32',
+    'daily_sold_units': 'float32',
+    'daily_production_units': 'float32',
+    'is_stockout': 'int8',
+}
+
+
+def _arrow_column_types():
+    """Traduit DTYPES (et la date) en types pyarrow pour le lecteur CSV."""
+    arrow_types = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'int32': pa.int32(),
+        'int8': pa.int8(),
+        'float32': pa.float32(),
+    }
+    column_types = {col: arrow_types[dtype] for col, dtype in DTYPES.items()}
+    column_types['date'] = pa.timestamp('ns')
+    return column_types
+
+
+def _read_chunks_arrow(csv_path):
+    """
+    Lit le CSV bloc par bloc avec le parseur C++ multi-thread de pyarrow.
+    
+    Args:
+        csv_path: Chemin vers le fichier CSV
+        
+    Yields:
+        pd.DataFrame: Bloc brut typé selon DTYPES
+    """
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=_arrow_column_types(),
+            strings_can_be_null=True
+        )
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def get_cache_path(csv_path):
+    """Retourne le chemin du cache Parquet associé au CSV (et à la version du chargeur)."""
+    return Path(f"{csv_path}.v{CACHE_VERSION}.parquet")
+
+
+def _guess_date_format(dates):
+    """
+    Déduit le format des dates à partir de la première valeur renseignée.
+    
+    Args:
+        dates: Colonne de dates brutes (texte)
+        
+    Returns:
+        str: Format strftime (None si la colonne est vide)
+    """
+    values = dates.dropna()
+    if values.empty:
+        return None
+    
+    date_format = guess_datetime_format(str(values.iloc[0]))
+    if date_format is None:
+        raise ValueError(f"Format de date non reconnu: {values.iloc[0]!r}")
+    return date_format
+
 
-def setup_database(csv_path=None):
+def _clean_chunk(chunk, date_format=None):
+    """
+    Valide et nettoie un bloc du CSV.
+    
+    Args:
+        chunk: DataFrame correspondant à un bloc du fichier
+        date_format: Format des dates, commun à tous les blocs (lecteur pandas)
+        
+    Returns:
+        pd.DataFrame: Bloc nettoyé
+    """
+    # Valider les colonnes essentielles
+    missing_cols = REQUIRED_COLS.difference(chunk.columns)
+    
+    if missing_cols:
+        raise ValueError(f"Colonnes manquantes: {sorted(missing_cols)}")
+    
+    # Dates lues en texte : conversion au format commun (erreur si invalides)
+    if not pd.api.types.is_datetime64_any_dtype(chunk['date']):
+        chunk['date'] = pd.to_datetime(chunk['date'], format=date_format, errors='raise')
+    
+    # Ajouter is_stockout si manquant
+    if 'is_stockout' not in chunk.columns:
+        chunk['is_stockout'] = np.equal(chunk['current_stock_level'].values, 0).view(np.int8)
+    
+    # Remplir les NaN dans daily_sold_units avec 0
+    if chunk['daily_sold_units'].isna().any():
+        chunk['daily_sold_units'] = chunk['daily_sold_units'].fillna(0)
+    
+    # Remplir les NaN dans daily_production_units avec 0
+    if 'daily_production_units' in chunk.columns:
+        chunk['daily_production_units'] = chunk['daily_production_units'].fillna(0)
+    
+    # S'assurer que les valeurs sont positives (colonne réécrite seulement si nécessaire)
+    for col in ('current_stock_level', 'daily_sold_units'):
+        values = chunk[col].to_numpy()
+        if (values < 0).any():
+            chunk[col] = np.maximum(values, 0)
+    
+    return chunk
+
+
+def _load_csv(csv_path, chunksize=CSV_CHUNKSIZE):
+    """
+    Charge, valide et nettoie le CSV brut bloc par bloc.
+    
+    Seul un bloc brut est en mémoire à la fois : la validation échoue dès
+    le premier bloc si des colonnes manquent.
+    
+    Args:
+        csv_path: Chemin vers le fichier CSV
+        chunksize: Nombre de lignes lues par bloc (lecteur pandas)
+        
+    Returns:
+        pd.DataFrame: Données nettoyées et triées par date
+    """
+    print("🔧 Lecture et nettoyage des données par blocs...")
+    chunks = None
+    
+    if PYARROW_AVAILABLE:
+        try:
+            chunks = [_clean_chunk(chunk) for chunk in _read_chunks_arrow(csv_path)]
+        except pa.ArrowInvalid as e:
+            print(f"⚠️ Lecture pyarrow impossible ({e}), utilisation du lecteur pandas")
+    
+    if chunks is None:
+        # Dates lues en texte : le format est déduit une seule fois (premier bloc)
+        # puis imposé aux suivants, pour ne pas interpréter chaque bloc différemment
+        reader = pd.read_csv(csv_path, chunksize=chunksize, dtype={**DTYPES, 'date': 'str'})
+        chunks = []
+        date_format = None
+        for chunk in reader:
+            if date_format is None:
+                date_format = _guess_date_format(chunk['date'])
+            chunks.append(_clean_chunk(chunk, date_format))
+    
+    if not chunks:
+        raise ValueError(f"Fichier CSV vide: {csv_path}")
+    
+    if len(chunks) > 1:
+        data = pd.concat(chunks)
+        # Les catégories diffèrent d'un bloc à l'autre : les réunifier
+        category_cols = [col for col, dtype in DTYPES.items() if dtype == 'category']
+        data = data.astype({col: 'category' for col in category_cols if col in data.columns})
+    else:
+        data = chunks[0]
+    
+    return data.sort_values('date', kind='stable', ignore_index=True)
+
+
+def setup_database(csv_path=None, use_cache=True):
     """
     Initialise et valide la base de données supply chain.
     
+    Le CSV nettoyé est mis en cache au format Parquet (``<csv>.v<N>.parquet``,
+    N = CACHE_VERSION) et rechargé directement tant qu'il est plus récent
+    que le CSV.
+    
     Args:
         csv_path: Chemin vers le fichier CSV (None = chemin par défaut)
+        use_cache: Utiliser/écrire le cache Parquet si pyarrow est disponible
         
     Returns:
         pd.DataFrame: Données chargées et validées
@@ -51,67 +241,43 @@ def setup_database(csv_path=None):
     if csv_path is None:
         csv_path = CSV_FILE_PATH
     
-    try:
-        # Charger les données
-        print(f"📂 Chargement de {csv_path}...")
-        
-        if not Path(csv_path).exists():
-            raise FileNotFoundError(
-                f"❌ Fichier CSV non trouvé: {csv_path}\n"
-                f"   Emplacements vérifiés:\n"
-                f"   - {PROJECT_ROOT / 'data' / 'data.csv'}\n"
-                f"   - {PROJECT_ROOT / 'enriched_supply_chain_data.csv'}\n"
-                f"   Placez votre CSV dans l'un de ces emplacements."
-            )
-        
-        data = pd.read_csv(csv_path)
-        
-        # Convertir la colonne date
-        print("📅 Conversion des dates...")
-        data['date'] = pd.to_datetime(data['date'])
-        data = data.sort_values('date')
-        
-        # Valider les colonnes essentielles
-        required_cols = ['Product type', 'date', 'current_stock_level', 'daily_sold_units']
-        missing_cols = [col for col in required_cols if col not in data.columns]
-        
-        if missing_cols:
-            raise ValueError(f"Colonnes manquantes: {missing_cols}")
-        
-        # Ajouter is_stockout si manquant
-        if 'is_stockout' not in data.columns:
-            print("➕ Ajout de la colonne 'is_stockout'...")
-            data['is_stockout'] = (data['current_stock_level'] == 0).astype(int)
-        
-        # Gérer les valeurs manquantes
-        print("🔧 Nettoyage des données...")
-        
-        # Remplir les NaN dans daily_sold_units avec 0
-        if data['daily_sold_units'].isna().any():
-            data['daily_sold_units'] = data['daily_sold_units'].fillna(0)
-        
-        # Remplir les NaN dans daily_production_units avec 0
-        if 'daily_production_units' in data.columns:
-            data['daily_production_units'] = data['daily_production_units'].fillna(0)
-        
-        # S'assurer que les valeurs sont positives
-        data['current_stock_level'] = data['current_stock_level'].clip(lower=0)
-        data['daily_sold_units'] = data['daily_sold_units'].clip(lower=0)
-        
-        print(f"✅ Base de données initialisée avec succès")
-        print(f"   - {len(data):,} enregistrements")
-        print(f"   - {data['Product type'].nunique()} produits: {data['Product type'].unique()[:5].tolist()}")
-        print(f"   - Période: {data['date'].min()} à {data['date'].max()}")
-        print(f"   - Colonnes: {len(data.columns)}")
-        
-        return data
+    # Charger les données
+    print(f"📂 Chargement de {csv_path}...")
+    
+    if not Path(csv_path).exists():
+        raise FileNotFoundError(
+            f"❌ Fichier CSV non trouvé: {csv_path}\n"
+            f"   Emplacements vérifiés:\n"
+            f"   - {PROJECT_ROOT / 'data' / 'data.csv'}\n"
+            f"   - {PROJECT_ROOT / 'enriched_supply_chain_data.csv'}\n"
+            f"   Placez votre CSV dans l'un de ces emplacements."
+        )
+    
+    cache_path = get_cache_path(csv_path)
+    use_cache = use_cache and PYARROW_AVAILABLE
+    
+    if (use_cache and cache_path.exists()
+            and cache_path.stat().st_mtime >= Path(csv_path).stat().st_mtime):
+        # Cache à jour : dates, types et nettoyage déjà appliqués
+        print(f"⚡ Chargement du cache {cache_path}...")
+        data = pd.read_parquet(cache_path, engine='pyarrow')
+    else:
+        data = _load_csv(csv_path)
         
-    except FileNotFoundError as e:
-        print(str(e))
-        raise
-    except Exception as e:
-        print(f"❌ Erreur d'initialisation: {e}")
-        raise
+        if use_cache:
+            try:
+                data.to_parquet(cache_path, engine='pyarrow')
+                print(f"💾 Cache Parquet créé: {cache_path}")
+            except Exception as e:
+                print(f"⚠️ Cache Parquet non écrit: {e}")
+    
+    print(f"✅ Base de données initialisée avec succès")
+    print(f"   - {len(data):,} enregistrements")
+    print(f"   - {data['Product type'].nunique()} produits: {data['Product type'].unique()[:5].tolist()}")
+    print(f"   - Période: {data['date'].min()} à {data['date'].max()}")
+    print(f"   - Colonnes: {len(data.columns)}")
+    
+    return data
 
 
 if __name__ == "__main__":
@@ -44,13 +44,14 @@ class AnalysisEngine:
             method: Méthode ('arima', 'prophet', 'hf_enhanced')
             
         Returns:
-            pd.DataFrame: Prévisions
+            tuple: (pd.DataFrame des prévisions, nom de la méthode utilisée),
+            (None, None) en cas d'échec
         """
         df = self.db.get_inventory_data(product, period_days=90)
         
         if len(df) < 20:
             print(f"⚠️ Pas assez de données pour {product}")
-            return None
+            return None, None
         
         if method == 'arima':
             return self._forecast_arima(df, horizon)
@@ -59,16 +60,37 @@ class AnalysisEngine:
         else:  # hf_enhanced
             return self._forecast_hf_enhanced(df, horizon, product)
     
+    @staticmethod
+    def unpack_forecast(result):
+        """
+        Sépare un résultat de prévision en (DataFrame, méthode).
+        
+        Accepte le format de forecast_demand (tuple) comme l'ancien format
+        (DataFrame avec une colonne 'method' répétée), le temps de la migration.
+        
+        Args:
+            result: Tuple (df, méthode), DataFrame ou None
+            
+        Returns:
+            tuple: (pd.DataFrame ou None, nom de la méthode ou None)
+        """
+        if isinstance(result, tuple):
+            return result
+        if result is None:
+            return None, None
+        if 'method' in result.columns:
+            return result.drop(columns='method'), result['method'].iloc[0]
+        return result, None
+    
     def _forecast_arima(self, df, horizon):
         """Prévision avec modèle ARIMA."""
         if not ARIMA_AVAILABLE:
             print("❌ statsmodels non installé. Installer avec: pip install statsmodels")
-            return None
+            return None, None
         
         try:
             # Préparer les données avec fréquence explicite
-            sales_df = df[['date', 'daily_sold_units']].copy()
-            sales_df = sales_df.set_index('date')
+            sales_df = df[['date', 'daily_sold_units']].set_index('date')
             sales_df = sales_df.fillna(0)
             
             # Définir la fréquence explicitement (quotidienne)
@@ -98,12 +120,11 @@ class AnalysisEngine:
                 'date': future_dates,
                 'predicted_demand': np.maximum(0, forecast.values),
                 'lower_bound': np.maximum(0, conf_int.iloc[:, 0].values),
-                'upper_bound': np.maximum(0, conf_int.iloc[:, 1].values),
-                'method': 'ARIMA'
+                'upper_bound': np.maximum(0, conf_int.iloc[:, 1].values)
             })
             
             print(f"✅ Prévision ARIMA: moyenne {results['predicted_demand'].mean():.1f} unités/jour")
-            return results
+            return results, 'ARIMA'
             
         except Exception as e:
             print(f"❌ Erreur ARIMA: {e}")
@@ -114,7 +135,7 @@ class AnalysisEngine:
         """Prévision avec Prophet."""
         if not PROPHET_AVAILABLE:
             print("❌ Prophet non installé. Installer avec: pip install prophet")
-            return None
+            return None, None
         
         try:
             prophet_df = df[['date', 'daily_sold_units']].copy()
@@ -152,11 +173,10 @@ class AnalysisEngine:
                 'date': forecast['ds'].values,
                 'predicted_demand': forecast['yhat'].clip(lower=0).values,
                 'lower_bound': forecast['yhat_lower'].clip(lower=0).values,
-                'upper_bound': forecast['yhat_upper'].clip(lower=0).values,
-                'method': 'Prophet'
+                'upper_bound': forecast['yhat_upper'].clip(lower=0).values
             })
             
-            return results
+            return results, 'Prophet'
             
         except AttributeError as e:
             if 'stan_backend' in str(e):
@@ -172,10 +192,10 @@ class AnalysisEngine:
     
     def _forecast_hf_enhanced(self, df, horizon, product):
         """Prévision améliorée avec analyse HF."""
-        base_forecast = self._forecast_prophet(df, horizon)
+        base_forecast, method_used = self._forecast_prophet(df, horizon)
         
         if base_forecast is None:
-            return None
+            return None, None
         
         # Analyser le sentiment si modèle disponible
         if 'sentiment' in self.hf_models:
@@ -185,40 +205,79 @@ class AnalysisEngine:
                 adjustment = 1 + (sentiment['score'] - 0.5) * 0.3
                 base_forecast['predicted_demand'] *= adjustment
                 base_forecast['upper_bound'] *= adjustment
-                base_forecast['method'] = 'HF-Enhanced Prophet'
+                method_used = 'HF-Enhanced Prophet'
                 print(f"  ✨ Prévisions ajustées avec sentiment positif (+{(adjustment-1)*100:.1f}%)")
         
-        return base_forecast
+        return base_forecast, method_used
     
     def analyze_market_sentiment(self, product):
         """Analyse le sentiment du marché avec HF."""
-        if 'sentiment' not in self.hf_models:
-            return None
+        return self.analyze_market_sentiments([product]).get(product)
+    
+    def analyze_market_sentiments(self, products, batch_size=8):
+        """
+        Analyse le sentiment du marché de plusieurs produits en un seul appel HF.
         
-        try:
-            df = self.db.get_inventory_data(product, period_days=30)
-            
-            avg_sales = df['daily_sold_units'].mean()
-            recent_sales = df['daily_sold_units'].tail(7).mean()
-            
-            if recent_sales > avg_sales * 1.2:
-                trend_text = f"Sales for {product} are increasing significantly with strong demand"
-            elif recent_sales < avg_sales * 0.8:
-                trend_text = f"Sales for {product} are declining with weak demand"
-            else:
-                trend_text = f"Sales for {product} are stable with steady demand"
-            
-            sentiment = self.hf_models['sentiment'](trend_text)[0]
+        Les descriptions de tendance sont envoyées ensemble au pipeline, qui
+        les traite par lots au lieu d'une inférence par produit. Si le lot
+        échoue, chaque description est reprise seule : seuls les produits en
+        erreur reçoivent None.
+        
+        Args:
+            products: Liste de produits
+            batch_size: Taille des lots d'inférence
             
+        Returns:
+            dict: Sentiment (ou None) par produit
+        """
+        results = {product: None for product in products}
+        if 'sentiment' not in self.hf_models or not products:
+            return results
+        
+        # Descriptions produit par produit : une erreur n'écarte que ce produit
+        trend_texts = {}
+        for product in results:
+            try:
+                trend_texts[product] = self._describe_sales_trend(product)
+            except Exception as e:
+                print(f"❌ Erreur d'analyse de sentiment ({product}): {e}")
+        
+        if not trend_texts:
+            return results
+        
+        sentiment_model = self.hf_models['sentiment']
+        try:
+            sentiments = dict(zip(trend_texts, sentiment_model(list(trend_texts.values()), batch_size=batch_size)))
+        except Exception as e:
+            print(f"⚠️ Analyse de sentiment par lot impossible ({e}), reprise produit par produit")
+            sentiments = {}
+            for product, trend_text in trend_texts.items():
+                try:
+                    sentiments[product] = sentiment_model(trend_text)[0]
+                except Exception as e:
+                    print(f"❌ Erreur d'analyse de sentiment ({product}): {e}")
+        
+        for product, sentiment in sentiments.items():
             print(f"\n📊 Analyse de sentiment pour {product}:")
-            print(f"  • Tendance: {trend_text}")
+            print(f"  • Tendance: {trend_texts[product]}")
             print(f"  • Sentiment: {sentiment['label']} (confiance: {sentiment['score']:.2%})")
-            
-            return sentiment
-            
-        except Exception as e:
-            print(f"❌ Erreur d'analyse de sentiment: {e}")
-            return None
+            results[product] = sentiment
+        
+        return results
+    
+    def _describe_sales_trend(self, product):
+        """Décrit en anglais la tendance des ventes récentes d'un produit."""
+        df = self.db.get_inventory_data(product, period_days=30)
+        
+        avg_sales = df['daily_sold_units'].mean()
+        recent_sales = df['daily_sold_units'].tail(7).mean()
+        
+        if recent_sales > avg_sales * 1.2:
+            return f"Sales for {product} are increasing significantly with strong demand"
+        elif recent_sales < avg_sales * 0.8:
+            return f"Sales for {product} are declining with weak demand"
+        else:
+            return f"Sales for {product} are stable with steady demand"
     
     def detect_stock_anomalies(self, product=None, threshold_std=2.5):
         """
@@ -238,15 +297,16 @@ class AnalysisEngine:
             return None
         
         anomalies = []
-        products = [product] if product else df['Product type'].unique()
+        # Un seul découpage par produit plutôt qu'un filtre complet par produit
+        groups = [(product, df)] if product else df.groupby('Product type', sort=False, observed=True)
         
-        for prod in products:
-            prod_df = df[df['Product type'] == prod].copy()
+        for prod, prod_df in groups:
+            # Lecture seule : pas de copie, les z-scores sont calculés à part
             mean_stock = prod_df['current_stock_level'].mean()
             std_stock = prod_df['current_stock_level'].std()
-            prod_df['z_score'] = (prod_df['current_stock_level'] - mean_stock) / std_stock
+            z_scores = (prod_df['current_stock_level'] - mean_stock) / std_stock
             
-            for idx, row in prod_df.iterrows():
+            for (idx, row), z_score in zip(prod_df.iterrows(), z_scores):
                 anomaly = None
                 
                 if row['is_stockout'] == 1 or row['current_stock_level'] == 0:
@@ -256,10 +316,10 @@ class AnalysisEngine:
                         'type': 'Rupture de stock',
                         'severity': 'critical',
                         'stock_level': row['current_stock_level'],
-                        'z_score': row['z_score'],
+                        'z_score': z_score,
                         'message': 'Stock épuisé'
                     }
-                elif abs(row['z_score']) > threshold_std:
+                elif abs(z_score) > threshold_std:
                     if row['current_stock_level'] > mean_stock:
                         anomaly = {
                             'date': row['date'],
@@ -267,8 +327,8 @@ class AnalysisEngine:
                             'type': 'Surstock',
                             'severity': 'warning',
                             'stock_level': row['current_stock_level'],
-                            'z_score': row['z_score'],
-                            'message': f"Stock anormalement élevé ({row['z_score']:.2f}σ)"
+                            'z_score': z_score,
+                            'message': f"Stock anormalement élevé ({z_score:.2f}σ)"
                         }
                     else:
                         anomaly = {
@@ -277,8 +337,8 @@ class AnalysisEngine:
                             'type': 'Stock critique',
                             'severity': 'danger',
                             'stock_level': row['current_stock_level'],
-                            'z_score': row['z_score'],
-                            'message': f"Stock anormalement bas ({row['z_score']:.2f}σ)"
+                            'z_score': z_score,
+                            'message': f"Stock anormalement bas ({z_score:.2f}σ)"
                         }
                 
                 if anomaly:
@@ -327,60 +387,60 @@ class AnalysisEngine:
     
     def suggest_restock_plan(self):
         """Calcule les quantités recommandées pour chaque produit."""
-        products = self.db.get_all_products()
-        restock_plan = []
+        # Agréger les 30 derniers jours de chaque produit en un seul groupby
+        recent = self.db.get_recent_data(period_days=30)
+        aggregations = {
+            'avg_daily_sales': ('daily_sold_units', 'mean'),
+            'current_stock': ('current_stock_level', 'last'),
+        }
         
-        for product in products:
-            df = self.db.get_inventory_data(product, period_days=30)
-            
-            if len(df) == 0:
-                continue
-            
-            avg_daily_sales = df['daily_sold_units'].mean()
-            current_stock = df['current_stock_level'].iloc[-1]
-            
-            # Gérer différents noms de colonnes pour le lead time
-            if 'Lead time' in df.columns:
-                avg_lead_time = df['Lead time'].mean()
-            elif 'Lead times' in df.columns:
-                avg_lead_time = df['Lead times'].mean()
-            else:
-                avg_lead_time = 7  # Valeur par défaut
-            
-            safety_stock = avg_daily_sales * 7
-            reorder_point = (avg_daily_sales * avg_lead_time) + safety_stock
-            optimal_order_qty = avg_daily_sales * 30
-            days_of_stock = current_stock / avg_daily_sales if avg_daily_sales > 0 else 999
-            
-            if current_stock <= reorder_point:
-                action = 'COMMANDER'
-                urgency = 'urgent' if current_stock < safety_stock else 'high'
-            elif current_stock > optimal_order_qty * 2:
-                action = 'SURSTOCK'
-                urgency = 'low'
-            else:
-                action = 'OK'
-                urgency = 'normal'
-            
-            plan_item = {
-                'product': product,
-                'current_stock': int(current_stock),
-                'avg_daily_sales': round(avg_daily_sales, 2),
-                'days_of_stock': round(days_of_stock, 1),
-                'reorder_point': int(reorder_point),
-                'safety_stock': int(safety_stock),
-                'suggested_order_qty': int(optimal_order_qty),
-                'action': action,
-                'urgency': urgency
-            }
-            
-            # Recommandation IA si disponible
-            if 'generator' in self.hf_models and urgency in ['urgent', 'high']:
-                plan_item['ai_recommendation'] = self._generate_ai_recommendation(product, plan_item)
-            
-            restock_plan.append(plan_item)
+        # Gérer différents noms de colonnes pour le lead time
+        if 'Lead time' in recent.columns:
+            aggregations['avg_lead_time'] = ('Lead time', 'mean')
+        elif 'Lead times' in recent.columns:
+            aggregations['avg_lead_time'] = ('Lead times', 'mean')
+        
+        grouped = recent.groupby('Product type', sort=False, observed=True).agg(**aggregations)
+        grouped = grouped.loc[[p for p in self.db.get_all_products() if p in grouped.index]]
+        
+        avg_daily_sales = grouped['avg_daily_sales']
+        current_stock = grouped['current_stock']
+        avg_lead_time = grouped['avg_lead_time'] if 'avg_lead_time' in grouped else 7  # Valeur par défaut
+        
+        safety_stock = avg_daily_sales * 7
+        reorder_point = (avg_daily_sales * avg_lead_time) + safety_stock
+        optimal_order_qty = avg_daily_sales * 30
+        days_of_stock = (current_stock / avg_daily_sales.where(avg_daily_sales > 0)).fillna(999)
+        
+        to_order = current_stock <= reorder_point
+        overstock = ~to_order & (current_stock > optimal_order_qty * 2)
+        action = np.select([to_order, overstock], ['COMMANDER', 'SURSTOCK'], default='OK')
+        urgency = np.select(
+            [to_order & (current_stock < safety_stock), to_order, overstock],
+            ['urgent', 'high', 'low'],
+            default='normal'
+        )
+        
+        restock_df = pd.DataFrame({
+            'product': grouped.index.tolist(),
+            'current_stock': current_stock.astype(int).values,
+            'avg_daily_sales': avg_daily_sales.round(2).values,
+            'days_of_stock': days_of_stock.round(1).values,
+            'reorder_point': reorder_point.astype(int).values,
+            'safety_stock': safety_stock.astype(int).values,
+            'suggested_order_qty': optimal_order_qty.astype(int).values,
+            'action': action,
+            'urgency': urgency
+        })
+        
+        # Recommandation IA si disponible
+        needs_ai = restock_df['urgency'].isin(['urgent', 'high'])
+        if 'generator' in self.hf_models and needs_ai.any():
+            restock_df.loc[needs_ai, 'ai_recommendation'] = [
+                self._generate_ai_recommendation(item['product'], item)
+                for item in restock_df[needs_ai].to_dict('records')
+            ]
         
-        restock_df = pd.DataFrame(restock_plan)
         urgency_order = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
         restock_df['urgency_rank'] = restock_df['urgency'].map(urgency_order)
         restock_df = restock_df.sort_values('urgency_rank').drop('urgency_rank', axis=1)
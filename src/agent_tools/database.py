@@ -2,12 +2,28 @@
 Script d'initialisation de la base de données
 """
 import pandas as pd
+import numpy as np
 from pathlib import Path
 from datetime import timedelta, datetime
 
 
 CSV_FILE_PATH = 'C:/Users/Pc-Marie/Documents/MASTER_APE/S3/Advancing_programming/projet_supply_chain/Projet/data/data.csv'
 
+# Colonnes indispensables au fonctionnement de l'agent
+REQUIRED_COLS = frozenset({'Product type', 'date', 'current_stock_level', 'daily_sold_units'})
+
+# Types des colonnes principales (lecture en une passe, mémoire réduite)
+DTYPES = {
+    'Product type': 'category',
+    'weather_condition': 'category',
+    'Supplier name': 'category',
+    'Location': 'category',
+    'current_stock_level': 'float32',
+    'daily_sold_units': 'float32',
+    'daily_production_units': 'float32',
+    'is_stockout': 'int8',
+}
+
 
 def setup_database(csv_path=CSV_FILE_PATH):
     """
@@ -19,54 +35,51 @@ def setup_database(csv_path=CSV_FILE_PATH):
     Returns:
         pd.DataFrame: Données chargées et validées
     """
-    try:
-        # Charger les données
-        print(f"📂 Chargement de {csv_path}...")
-        data = pd.read_csv(csv_path)
-        
-        # Convertir la colonne date
-        print("📅 Conversion des dates...")
-        data['date'] = pd.to_datetime(data['date'])
-        data = data.sort_values('date')
-        
-        # Valider les colonnes essentielles
-        required_cols = ['Product type', 'date', 'current_stock_level', 'daily_sold_units']
-        missing_cols = [col for col in required_cols if col not in data.columns]
-        
-        if missing_cols:
-            raise ValueError(f"Colonnes manquantes: {missing_cols}")
-        
-        # Ajouter is_stockout si manquant
-        if 'is_stockout' not in data.columns:
-            print("➕ Ajout de la colonne 'is_stockout'...")
-            data['is_stockout'] = (data['current_stock_level'] == 0).astype(int)
-        
-        # Gérer les valeurs manquantes
-        print("🔧 Nettoyage des données...")
-        
-        # Remplir les NaN dans daily_sold_units avec 0
-        if data['daily_sold_units'].isna().any():
-            data['daily_sold_units'] = data['daily_sold_units'].fillna(0)
-        
-        # Remplir les NaN dans daily_production_units avec 0
-        if 'daily_production_units' in data.columns:
-            data['daily_production_units'] = data['daily_production_units'].fillna(0)
-        
-        # S'assurer que les valeurs sont positives
-        data['current_stock_level'] = data['current_stock_level'].clip(lower=0)
-        data['daily_sold_units'] = data['daily_sold_units'].clip(lower=0)
-        
-        print(f"✅ Base de données initialisée avec succès")
-        print(f"   - {len(data):,} enregistrements")
-        print(f"   - {data['Product type'].nunique()} produits: {data['Product type'].unique()[:5].tolist()}")
-        print(f"   - Période: {data['date'].min()} à {data['date'].max()}")
-        print(f"   - Colonnes: {len(data.columns)}")
-        
-        return data
-        
-    except Exception as e:
-        print(f"❌ Erreur d'initialisation: {e}")
-        raise
+    # Charger les données
+    print(f"📂 Chargement de {csv_path}...")
+    data = pd.read_csv(csv_path, dtype=DTYPES, parse_dates=['date'])
+    
+    # Dates non reconnues à la lecture : conversion explicite (erreur si invalides)
+    if not pd.api.types.is_datetime64_any_dtype(data['date']):
+        data['date'] = pd.to_datetime(data['date'], errors='raise')
+    data = data.sort_values('date', kind='stable', ignore_index=True)
+    
+    # Valider les colonnes essentielles
+    missing_cols = REQUIRED_COLS.difference(data.columns)
+    
+    if missing_cols:
+        raise ValueError(f"Colonnes manquantes: {sorted(missing_cols)}")
+    
+    # Ajouter is_stockout si manquant
+    if 'is_stockout' not in data.columns:
+        print("➕ Ajout de la colonne 'is_stockout'...")
+        data['is_stockout'] = np.equal(data['current_stock_level'].values, 0).view(np.int8)
+    
+    # Gérer les valeurs manquantes
+    print("🔧 Nettoyage des données...")
+    
+    # Remplir les NaN dans daily_sold_units avec 0
+    if data['daily_sold_units'].isna().any():
+        data['daily_sold_units'] = data['daily_sold_units'].fillna(0)
+    
+    # Remplir les NaN dans daily_production_units avec 0
+    if 'daily_production_units' in data.columns:
+        data['daily_production_units'] = data['daily_production_units'].fillna(0)
+    
+    # S'assurer que les valeurs sont positives (colonne réécrite seulement si nécessaire)
+    for col in ('current_stock_level', 'daily_sold_units'):
+        values = data[col].to_numpy()
+        if (values < 0).any():
+            data[col] = np.maximum(values, 0)
+    
+    print(f"✅ Base de données initialisée avec succès")
+    print(f"   - {len(data):,} enregistrements")
+    print(f"   - {data['Product type'].nunique()} produits: {data['Product type'].unique()[:5].tolist()}")
+    print(f"   - Période: {data['date'].min()} à {data['date'].max()}")
+    print(f"   - Colonnes: {len(data.columns)}")
+    
+    return data
+
 
 if __name__ == "__main__":
     # Test du setup
@@ -82,26 +95,62 @@ class DatabaseManager:
         """
         Initialise le gestionnaire avec les données.
         
+        Le DataFrame n'est pas copié : il est partagé avec l'appelant et doit
+        être considéré en lecture seule (les colonnes manquantes sont ajoutées
+        directement dessus).
+        
         Args:
             data: DataFrame pandas contenant les données
         """
-        self.data = data.copy()
+        self.data = data
         
         # Assurer que la colonne 'is_stockout' existe
         if 'is_stockout' not in self.data.columns:
-            self.data['is_stockout'] = (self.data['current_stock_level'] == 0).astype(int)
+            self.data['is_stockout'] = np.equal(self.data['current_stock_level'].values, 0).view(np.int8)
         
         # Convertir la date si ce n'est pas déjà fait
         if not pd.api.types.is_datetime64_any_dtype(self.data['date']):
             self.data['date'] = pd.to_datetime(self.data['date'])
         
-        # S'assurer que les données sont triées par date
-        self.data = self.data.sort_values('date').reset_index(drop=True)
+        # S'assurer que les données sont triées par date (sans recopier si c'est déjà le cas)
+        if not self.data['date'].is_monotonic_increasing:
+            self.data = self.data.sort_values('date', kind='stable', ignore_index=True)
+        elif not self.data.index.equals(pd.RangeIndex(len(self.data))):
+            self.data = self.data.reset_index(drop=True)
+        
+        # Index et résultats mémorisés des lectures
+        self.clear_cache()
+    
+    def _build_indexes(self):
+        """Construit les index par produit et par date à partir de self.data."""
+        # Positions des lignes par produit (évite un filtre complet à chaque appel
+        # sans dupliquer les données : seules les lignes demandées sont extraites)
+        self._group_positions = self.data.groupby('Product type', sort=False, observed=True).indices
+        
+        # Dates triées (globales et par produit) en entiers int64 pour les recherches dichotomiques
+        date_values = self.data['date'].values
+        self._date_dtype = date_values.dtype
+        self._date_i8 = date_values.view('i8')
+        self._group_dates = {product: self._date_i8[positions] for product, positions in self._group_positions.items()}
+    
+    def clear_cache(self):
+        """Reconstruit les index et vide les résultats mémorisés (à appeler si self.data est modifié)."""
+        self._build_indexes()
+        self._inventory_cache = {}
+        self._stats_cache = {}
+        self._date_range = None
+        self._summary = None
     
     def get_inventory_data(self, product=None, period_days=90):
         """
         Extrait les données historiques de stock et ventes.
         
+        Le résultat est mémorisé par (produit, période) : le DataFrame
+        retourné partage ses données avec le cache et ne doit pas être
+        modifié sur place. Les colonnes gardent les types du chargement
+        ('date' en datetime64, stocks et ventes numériques) et peuvent être
+        passées telles quelles (``to_numpy()``) à matplotlib.
+        
         Args:
             product: Nom du produit (None pour tous)
             period_days: Nombre de jours à extraire
@@ -109,19 +158,56 @@ class DatabaseManager:
         Returns:
             pd.DataFrame: Données filtrées
         """
-        df = self.data.copy()
+        key = (product, period_days)
+        if key not in self._inventory_cache:
+            self._inventory_cache[key] = self._extract_inventory_data(product, period_days)
+        return self._inventory_cache[key].copy(deep=False)
+    
+    def get_inventory_data_multi(self, products, period_days=30):
+        """
+        Extrait en un seul appel les données de plusieurs produits.
+        
+        Chaque produit est filtré sur sa propre période (comme
+        get_inventory_data) ; le résultat est au format long, trié par
+        produit (ordre de la liste) puis par date.
         
+        Args:
+            products: Liste de noms de produits
+            period_days: Nombre de jours à extraire
+            
+        Returns:
+            pd.DataFrame: Données concaténées (colonne 'Product type')
+        """
+        # Tranches issues de l'index par produit (aucun filtre sur tout le DataFrame)
+        frames = [
+            self.get_inventory_data(product, period_days)
+            for product in dict.fromkeys(products)
+            if product in self._group_positions
+        ]
+        if not frames:
+            return self.data.iloc[:0].copy(deep=False)
+        return pd.concat(frames, ignore_index=True)
+    
+    def _extract_inventory_data(self, product, period_days):
+        """Filtre les données par produit et par période."""
         # Filtrer par produit si spécifié
         if product:
-            df = df[df['Product type'] == product]
+            positions = self._group_positions.get(product, self._date_i8[:0])
+            dates = self._group_dates.get(product, self._date_i8[:0])
+        else:
+            positions = None
+            dates = self._date_i8
         
-        # Filtrer par période
-        if len(df) > 0:
-            end_date = df['date'].max()
-            start_date = end_date - timedelta(days=period_days)
-            df = df[df['date'] >= start_date]
+        # Filtrer par période (données triées : recherche dichotomique)
+        start = 0
+        if len(dates) > 0:
+            end_date = dates[-1].view(self._date_dtype)
+            start_i8 = (end_date - np.timedelta64(timedelta(days=period_days))).astype(self._date_dtype).view('i8')
+            start = np.searchsorted(dates, start_i8, side='left')
         
-        return df.reset_index(drop=True)
+        if positions is None:
+            return self.data.iloc[start:].reset_index(drop=True)
+        return self.data.take(positions[start:]).reset_index(drop=True)
     
     def get_product_stats(self, product, period_days=30):
         """
@@ -134,40 +220,114 @@ class DatabaseManager:
         Returns:
             dict: Statistiques du produit
         """
-        df = self.get_inventory_data(product, period_days)
+        stats = self._get_stats_table(period_days).get(product)
+        return dict(stats) if stats else None
+    
+    def _get_stats_table(self, period_days):
+        """
+        Calcule en un seul groupby les statistiques de tous les produits.
         
-        if len(df) == 0:
-            return None
+        Chaque produit est analysé sur ses ``period_days`` derniers jours ;
+        le résultat est mémorisé par période.
         
-        stats = {
-            'total_sales': df['daily_sold_units'].sum(),
-            'avg_daily_sales': df['daily_sold_units'].mean(),
-            'current_stock': df['current_stock_level'].iloc[-1],
-            'min_stock': df['current_stock_level'].min(),
-            'max_stock': df['current_stock_level'].max(),
-            'stockout_days': (df['is_stockout'] == 1).sum() if 'is_stockout' in df.columns else 0
+        Args:
+            period_days: Période d'analyse
+            
+        Returns:
+            dict: Statistiques indexées par produit
+        """
+        if period_days in self._stats_cache:
+            return self._stats_cache[period_days]
+        
+        data = self.data
+        recent = self.get_recent_data(period_days)
+        # Agrégats accumulés en float64 (les colonnes sont stockées en float32)
+        recent = recent.assign(
+            stockout_day=(recent['is_stockout'] == 1),
+            **{col: recent[col].astype('float64')
+               for col in ('daily_sold_units', 'daily_production_units')
+               if col in recent.columns}
+        )
+        
+        aggregations = {
+            'total_sales': ('daily_sold_units', 'sum'),
+            'avg_daily_sales': ('daily_sold_units', 'mean'),
+            'current_stock': ('current_stock_level', 'last'),
+            'min_stock': ('current_stock_level', 'min'),
+            'max_stock': ('current_stock_level', 'max'),
+            'stockout_days': ('stockout_day', 'sum'),
         }
         
         # Ajouter des stats supplémentaires si disponibles
-        if 'Revenue generated' in df.columns:
-            stats['total_revenue'] = df['Revenue generated'].sum()
+        if 'Revenue generated' in data.columns:
+            aggregations['total_revenue'] = ('Revenue generated', 'sum')
         
-        if 'Price' in df.columns:
-            stats['avg_price'] = df['Price'].mean()
+        if 'Price' in data.columns:
+            aggregations['avg_price'] = ('Price', 'mean')
         
-        if 'daily_production_units' in df.columns:
-            stats['total_production'] = df['daily_production_units'].sum()
+        if 'daily_production_units' in data.columns:
+            aggregations['total_production'] = ('daily_production_units', 'sum')
         
-        return stats
+        table = recent.groupby('Product type', sort=False, observed=True).agg(**aggregations)
+        self._stats_cache[period_days] = table.to_dict('index')
+        return self._stats_cache[period_days]
+    
+    def get_product_data(self, product):
+        """
+        Retourne tout l'historique d'un produit, trié par date.
+        
+        Args:
+            product: Nom du produit
+            
+        Returns:
+            pd.DataFrame: Données du produit (vide si inconnu)
+        """
+        return self.data.take(self._group_positions.get(product, self._date_i8[:0]))
+    
+    def get_recent_data(self, period_days=30):
+        """
+        Extrait, pour chaque produit, ses ``period_days`` derniers jours.
+        
+        Contrairement à get_inventory_data(None, ...), la fenêtre est calculée
+        à partir de la dernière date de chaque produit.
+        
+        Args:
+            period_days: Nombre de jours à extraire
+            
+        Returns:
+            pd.DataFrame: Données filtrées, triées par date
+        """
+        end_dates = self.data.groupby('Product type', sort=False, observed=True)['date'].transform('max')
+        return self.data[self.data['date'] >= end_dates - timedelta(days=period_days)]
     
     def get_all_products(self):
         """
         Retourne la liste de tous les produits.
         
         Returns:
-            list: Liste des noms de produits
+            list: Liste des noms de produits (ordre d'apparition)
+        """
+        # Clés de l'index par produit : aucun parcours de la colonne
+        return list(self._group_positions)
+    
+    def get_top_products(self, metric='daily_sold_units', n=5, period_days=30):
+        """
+        Retourne les produits ayant le total le plus élevé pour une métrique.
+        
+        Chaque produit est évalué sur ses ``period_days`` derniers jours
+        (même fenêtre que get_inventory_data).
+        
+        Args:
+            metric: Colonne numérique à additionner
+            n: Nombre de produits à retourner
+            period_days: Période d'analyse
+            
+        Returns:
+            list: Noms des produits, du total le plus élevé au plus faible
         """
-        return self.data['Product type'].unique().tolist()
+        recent = self.get_recent_data(period_days)
+        totals = recent.groupby('Product type', sort=False, observed=True)[metric].sum()
+        return totals.nlargest(n).index.tolist()
     
     def get_date_range(self):
         """
@@ -176,16 +336,39 @@ class DatabaseManager:
         Returns:
             dict: Informations sur la période
         """
-        return {
-            'start': self.data['date'].min(),
-            'end': self.data['date'].max(),
-            'days': (self.data['date'].max() - self.data['date'].min()).days
-        }
+        if self._date_range is None:
+            start = self.data['date'].min()
+            end = self.data['date'].max()
+            self._date_range = {
+                'start': start,
+                'end': end,
+                'days': (end - start).days
+            }
+        return dict(self._date_range)
+    
+    def get_summary_stats(self):
+        """
+        Calcule les indicateurs globaux (une seule fois).
+        
+        Returns:
+            dict: Nombre d'enregistrements et de produits, ventes, stock et ruptures
+        """
+        if self._summary is None:
+            data = self.data
+            self._summary = {
+                'total_records': len(data),
+                'total_products': len(self._group_positions),
+                'total_sales': data['daily_sold_units'].astype('float64').sum(),
+                'avg_daily_sales': data['daily_sold_units'].astype('float64').mean(),
+                'total_stock': data.groupby('Product type', sort=False, observed=True)['current_stock_level'].last().astype('float64').sum(),
+                'stockout_incidents': (data['is_stockout'] == 1).sum()
+            }
+        return dict(self._summary)
     
     def __repr__(self):
         """Représentation textuelle du gestionnaire."""
         return (f"DatabaseManager(records={len(self.data)}, "
-                f"products={self.data['Product type'].nunique()}, "
+                f"products={len(self._group_positions)}, "
                 f"period={self.data['date'].min()} to {self.data['date'].max()})")
     
     def __len__(self):
@@ -22,6 +22,9 @@ class ReportGenerator:
         """
         Crée un rapport complet d'analyse avec Hugging Face.
         
+        Chaque section est affichée et écrite dans le fichier dès qu'elle
+        est générée.
+        
         Args:
             output_file: Nom du fichier de sortie
             
@@ -33,64 +36,74 @@ class ReportGenerator:
         print("="*60 + "\n")
         
         report_lines = []
-        report_lines.append("="*60)
-        report_lines.append("RAPPORT D'ANALYSE SUPPLY CHAIN 🤗 HUGGING FACE")
-        report_lines.append("="*60)
-        report_lines.append(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        date_range = self.db.get_date_range()
-        report_lines.append(f"Période: {date_range['start']} à {date_range['end']}")
-        report_lines.append("")
-        
-        # Statistiques générales
-        report_lines.extend(self._generate_general_stats())
-        
-        # Analyse par produit
-        report_lines.extend(self._generate_product_analysis())
-        
-        # Anomalies
-        report_lines.extend(self._generate_anomaly_report())
-        
-        # Plan de réapprovisionnement
-        report_lines.extend(self._generate_restock_report())
-        
-        # Footer
-        report_lines.append("\n💡 POWERED BY HUGGING FACE 🤗")
-        report_lines.append("="*60)
         
-        report_text = "\n".join(report_lines)
-        print(report_text)
-        
-        # Sauvegarder
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(report_text)
+            def emit(lines):
+                """Affiche et sauvegarde une section dès qu'elle est prête."""
+                section = "\n".join(lines)
+                print(section)
+                f.write(section + "\n")
+                report_lines.extend(lines)
+            
+            date_range = self.db.get_date_range()
+            emit([
+                "="*60,
+                "RAPPORT D'ANALYSE SUPPLY CHAIN 🤗 HUGGING FACE",
+                "="*60,
+                f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                f"Période: {date_range['start']} à {date_range['end']}",
+                ""
+            ])
+            
+            # Indicateurs globaux calculés une seule fois pour tout le rapport
+            summary = self.db.get_summary_stats()
+            
+            # Statistiques générales
+            emit(self._generate_general_stats(summary))
+            
+            # Analyse par produit
+            products = self.db.get_all_products()[:3]
+            sentiments = self.analysis.analyze_market_sentiments(products)
+            emit(self._generate_product_analysis(products, sentiments))
+            
+            # Anomalies
+            emit(self._generate_anomaly_report(self.analysis.detect_stock_anomalies()))
+            
+            # Plan de réapprovisionnement
+            emit(self._generate_restock_report(self.analysis.suggest_restock_plan()))
+            
+            # Footer
+            emit(["\n💡 POWERED BY HUGGING FACE 🤗", "="*60])
         
         print(f"\n✅ Rapport sauvegardé: {output_file}")
-        return report_text
+        return "\n".join(report_lines)
     
-    def _generate_general_stats(self):
+    def _generate_general_stats(self, summary):
         """Génère les statistiques générales."""
         lines = []
         lines.append("📈 STATISTIQUES GÉNÉRALES")
         lines.append("-" * 60)
         
-        data = self.db.data
-        lines.append(f"Enregistrements: {len(data)}")
-        lines.append(f"Produits: {data['Product type'].nunique()}")
-        lines.append(f"Ventes totales: {data['daily_sold_units'].sum():.0f} unités")
-        lines.append(f"Stock total: {data.groupby('Product type')['current_stock_level'].last().sum():.0f} unités")
+        lines.append(f"Enregistrements: {summary['total_records']}")
+        lines.append(f"Produits: {summary['total_products']}")
+        lines.append(f"Ventes totales: {summary['total_sales']:.0f} unités")
+        lines.append(f"Stock total: {summary['total_stock']:.0f} unités")
         lines.append("")
         
         return lines
     
-    def _generate_product_analysis(self):
-        """Génère l'analyse par produit."""
+    def _generate_product_analysis(self, products, sentiments):
+        """
+        Génère l'analyse par produit.
+        
+        Args:
+            products: Produits à détailler
+            sentiments: Sentiment HF déjà calculé pour chaque produit
+        """
         lines = []
         lines.append("📦 ANALYSE PAR PRODUIT (avec sentiment HF)")
         lines.append("-" * 60)
         
-        products = self.db.get_all_products()[:3]
-        
         for product in products:
             stats = self.db.get_product_stats(product, period_days=30)
             
@@ -101,21 +114,19 @@ class ReportGenerator:
                 lines.append(f"  • Stock actuel: {stats['current_stock']:.0f} unités")
                 
                 # Analyse de sentiment HF
-                sentiment = self.analysis.analyze_market_sentiment(product)
+                sentiment = sentiments.get(product)
                 if sentiment:
                     lines.append(f"  • 🤗 Sentiment: {sentiment['label']} ({sentiment['score']:.2%})")
         
         lines.append("")
         return lines
     
-    def _generate_anomaly_report(self):
-        """Génère le rapport des anomalies."""
+    def _generate_anomaly_report(self, all_anomalies):
+        """Génère le rapport des anomalies à partir des anomalies détectées."""
         lines = []
         lines.append("\n⚠️ ANOMALIES DÉTECTÉES (avec classification HF)")
         lines.append("-" * 60)
         
-        all_anomalies = self.analysis.detect_stock_anomalies()
-        
         if all_anomalies is not None and len(all_anomalies) > 0:
             lines.append(f"Total: {len(all_anomalies)} anomalies")
             
@@ -130,13 +141,12 @@ class ReportGenerator:
         lines.append("")
         return lines
     
-    def _generate_restock_report(self):
-        """Génère le plan de réapprovisionnement."""
+    def _generate_restock_report(self, restock):
+        """Génère le rapport à partir du plan de réapprovisionnement."""
         lines = []
         lines.append("\n📋 PLAN DE RÉAPPROVISIONNEMENT (avec IA)")
         lines.append("-" * 60)
         
-        restock = self.analysis.suggest_restock_plan()
         urgent = restock[restock['urgency'].isin(['urgent', 'high'])]
         
         if len(urgent) > 0:
@@ -190,12 +200,13 @@ class ReportGenerator:
         # Prévisions
         lines.append("🔮 PRÉVISIONS (14 jours)")
         lines.append("-" * 60)
-        forecast = self.analysis.forecast_demand(product, horizon=14)
+        forecast, method_used = self.analysis.unpack_forecast(
+            self.analysis.forecast_demand(product, horizon=14))
         if forecast is not None:
             total_forecast = forecast['predicted_demand'].sum()
             lines.append(f"Demande prévue totale: {total_forecast:.0f} unités")
             lines.append(f"Demande moyenne/jour: {total_forecast/14:.2f} unités")
-            lines.append(f"Méthode: {forecast['method'].iloc[0]}")
+            lines.append(f"Méthode: {method_used}")
         lines.append("")
         
         # Anomalies
@@ -223,17 +234,17 @@ class ReportGenerator:
     
     def generate_summary_stats(self):
         """Génère un résumé statistique rapide."""
-        data = self.db.data
+        stats = self.db.get_summary_stats()
         date_range = self.db.get_date_range()
         
         summary = {
-            'total_records': len(data),
-            'total_products': data['Product type'].nunique(),
+            'total_records': stats['total_records'],
+            'total_products': stats['total_products'],
             'date_range': f"{date_range['start']} à {date_range['end']}",
-            'total_sales': data['daily_sold_units'].sum(),
-            'avg_daily_sales': data['daily_sold_units'].mean(),
-            'total_stock': data.groupby('Product type')['current_stock_level'].last().sum(),
-            'stockout_incidents': (data['is_stockout'] == 1).sum()
+            'total_sales': stats['total_sales'],
+            'avg_daily_sales': stats['avg_daily_sales'],
+            'total_stock': stats['total_stock'],
+            'stockout_incidents': stats['stockout_incidents']
         }
         
         return summary
\ No newline at end of file
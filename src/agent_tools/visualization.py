@@ -2,38 +2,278 @@
 Outils de visualisation des données
 """
 from datetime import timedelta, datetime
+from importlib.util import find_spec
+from pathlib import Path
+import logging
 import pandas as pd
 import numpy as np
 
-# Imports optionnels
-try:
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    PLOT_AVAILABLE = True
-    # Configuration du style
-    sns.set_style("whitegrid")
-    plt.rcParams['figure.dpi'] = 100
-    plt.rcParams['figure.figsize'] = (16, 8)
-except ImportError:
-    PLOT_AVAILABLE = False
+# Imports optionnels : matplotlib/seaborn ne sont importés qu'au premier graphique
+PLOT_AVAILABLE = find_spec('matplotlib') is not None and find_spec('seaborn') is not None
+if not PLOT_AVAILABLE:
     print("⚠️ matplotlib/seaborn non disponibles. Installer avec: pip install matplotlib seaborn")
 
+log = logging.getLogger(__name__)
+
+# Colonnes utilisées par les graphiques de stock et de ventes
+PLOT_COLUMNS = ['date', 'current_stock_level', 'daily_sold_units']
+
+def _rgba(hex_color):
+    """Convertit une couleur '#rrggbb' en tuple RGBA (valeurs entre 0 et 1)."""
+    return tuple(int(hex_color[i:i + 2], 16) / 255 for i in (1, 3, 5)) + (1.0,)
+
+# Palette RGBA calculée une fois (sans importer matplotlib)
+_BLUE = _rgba('#3b82f6')
+_DARK_BLUE = _rgba('#1e40af')
+_GREEN = _rgba('#10b981')
+_DARK_GREEN = _rgba('#059669')
+_PURPLE = _rgba('#8b5cf6')
+_RED = _rgba('#dc2626')
+_GRAY = _rgba('#808080')
+_LIGHT_GRAY = _rgba('#f8f9fa')
+_INDIGO = _rgba('#6366f1')
+_LIGHT_INDIGO = _rgba('#e0e7ff')
+_SEV = {
+    'critical': _rgba('#ef4444'),
+    'danger': _rgba('#f97316'),
+    'warning': _rgba('#eab308')
+}
+_URG = {
+    'urgent': _SEV['critical'],
+    'high': _SEV['danger'],
+    'normal': _GREEN,
+    'low': _BLUE
+}
+
+plt = None
+sns = None
+mdates = None
+def _mpl():
+    """
+    Importe matplotlib/seaborn au premier appel et applique le style.
+    
+    Les modules sont ensuite disponibles via les globales ``plt``, ``sns``
+    et ``mdates`` (matplotlib.dates).
+    
+    Returns:
+        module: matplotlib.pyplot
+    """
+    global plt, sns, mdates
+    if plt is None:
+        import matplotlib.pyplot as _plt
+        import matplotlib.dates as _mdates
+        import seaborn as _sns
+        plt, sns, mdates = _plt, _sns, _mdates
+        
+        # Style des graphiques, appliqué une seule fois avec l'import
+        sns.set_style("whitegrid")
+        plt.rcParams['figure.dpi'] = 100
+        plt.rcParams['figure.figsize'] = (16, 8)
+    return plt
+
 class Visualizer:
     """Gestionnaire de visualisations pour la supply chain."""
     
-    def __init__(self, db_manager, analysis_engine):
+    def __init__(self, db_manager, analysis_engine, high_dpi=False):
         """
         Initialise le visualiseur.
         
         Args:
             db_manager: Instance de DatabaseManager
             analysis_engine: Instance d'AnalysisEngine
+            high_dpi: Sauvegarder les graphiques en 300 dpi (150 par défaut)
         """
         self.db = db_manager
         self.analysis = analysis_engine
+        self.save_dpi = 300 if high_dpi else 150
+        
+        # Résultats d'analyse mémorisés entre graphiques d'une même session
+        self._anomaly_cache = {}
+        self._forecast_cache = {}
+        
+        # Figures réutilisées d'un appel à l'autre, par type de graphique
+        self._fig_pool = {}
         
         if not PLOT_AVAILABLE:
-            print("⚠️ Visualisations désactivées (matplotlib non disponible)")
+            log.warning("Visualisations désactivées (matplotlib non disponible)")
+    
+    def invalidate_cache(self):
+        """Vide les résultats mémorisés (à appeler après une modification des données)."""
+        self._anomaly_cache = {}
+        self._forecast_cache = {}
+        self.db.clear_cache()
+    
+    def _load_plot_data(self, product, days):
+        """
+        Données prêtes à tracer (colonnes utiles, types natifs) d'un produit.
+        
+        La tranche elle-même est mémorisée par DatabaseManager ; vider son
+        cache (invalidate_cache) suffit après une modification des données.
+        
+        Args:
+            product: Nom du produit (None pour tous)
+            days: Nombre de jours à extraire
+            
+        Returns:
+            pd.DataFrame: Colonnes PLOT_COLUMNS, à ne pas modifier sur place
+        """
+        df = self.db.get_inventory_data(product, period_days=days)
+        return self._coerce(df[PLOT_COLUMNS])
+    
+    def _get_anomalies(self, product):
+        """Anomalies détectées pour un produit, calculées une seule fois."""
+        if product not in self._anomaly_cache:
+            self._anomaly_cache[product] = self.analysis.detect_stock_anomalies(product)
+        return self._anomaly_cache[product]
+    
+    def _get_forecast(self, product, horizon, method):
+        """Prévisions (DataFrame, méthode) d'un produit, calculées une seule fois par paramétrage."""
+        key = (product, horizon, method)
+        if key not in self._forecast_cache:
+            self._forecast_cache[key] = self.analysis.unpack_forecast(
+                self.analysis.forecast_demand(product, horizon, method))
+        return self._forecast_cache[key]
+    
+    def _get_fig(self, key, nrows=1, figsize=(14, 6)):
+        """
+        Retourne une figure du pool (axes vidés) ou en crée une nouvelle.
+        
+        La figure retournée devient la figure courante de pyplot.
+        
+        Args:
+            key: Type de graphique (une figure par type)
+            nrows: Nombre de lignes de sous-graphiques
+            figsize: Taille de la figure à la création
+            
+        Returns:
+            tuple: (fig, axes) comme plt.subplots
+        """
+        _mpl()
+        entry = self._fig_pool.get(key)
+        if entry is not None and plt.fignum_exists(entry[0].number):
+            fig, axes = entry
+            for ax in np.atleast_1d(axes):
+                ax.cla()
+            for text in list(fig.texts):
+                text.remove()
+            plt.figure(fig.number)
+            return fig, axes
+        
+        fig, axes = plt.subplots(nrows, 1, figsize=figsize, constrained_layout=True)
+        self._fig_pool[key] = (fig, axes)
+        return fig, axes
+    
+    def _finish(self, fig, save_path, **savefig_kwargs):
+        """
+        Sauvegarde la figure si une destination est donnée, sinon l'affiche.
+        
+        La destination peut être un chemin ou un objet fichier binaire
+        (ex. io.BytesIO pour récupérer l'image en mémoire, au format PNG par
+        défaut). La mise en page vient de constrained_layout : pas de second rendu
+        pour 'bbox_inches'. Les PNG sont compressés au niveau 1 (plus rapide).
+        
+        En mode sauvegarde, plt.show() n'est pas appelé : la figure reste
+        dans le pool pour le prochain graphique du même type.
+        
+        Args:
+            fig: Figure à finaliser
+            save_path: Chemin ou fichier de sauvegarde (None pour afficher)
+            **savefig_kwargs: Options supplémentaires de savefig
+        """
+        if not save_path:
+            plt.show()
+            return
+        
+        if hasattr(save_path, 'write'):
+            savefig_kwargs.setdefault('format', 'png')
+        fmt = (savefig_kwargs.get('format')
+               or Path(save_path).suffix.lstrip('.').lower()
+               or plt.rcParams['savefig.format'])
+        if fmt == 'png':
+            savefig_kwargs.setdefault('pil_kwargs', {'compress_level': 1})
+        
+        fig.savefig(save_path, dpi=self.save_dpi, **savefig_kwargs)
+        log.info("Graphique sauvegardé: %s", save_path)
+    
+    def close_all(self):
+        """Ferme toutes les figures du pool."""
+        for fig, _ in self._fig_pool.values():
+            plt.close(fig)
+        self._fig_pool = {}
+    
+    @staticmethod
+    def _coerce(df):
+        """
+        Garantit des colonnes natives numpy avant le tracé.
+        
+        Les dates sont converties en datetime64 et les métriques de stock et
+        de ventes en numérique ; le DataFrame est retourné tel quel (sans
+        copie) s'il est déjà conforme, ce qui est le cas des données issues
+        de DatabaseManager.
+        
+        Args:
+            df: DataFrame à tracer
+            
+        Returns:
+            pd.DataFrame: DataFrame aux types natifs
+        """
+        updates = {}
+        if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+            updates['date'] = pd.to_datetime(df['date'])
+        for col in ('current_stock_level', 'daily_sold_units'):
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                updates[col] = pd.to_numeric(df[col], errors='coerce')
+        return df.assign(**updates) if updates else df
+    
+    @staticmethod
+    def _downsample(x, y, target=1400):
+        """
+        Réduit une série à son enveloppe min/max par intervalle.
+        
+        Au-delà de 2 × ``target`` points, la série est découpée en ``target``
+        intervalles consécutifs dont on garde le minimum et le maximum : le
+        tracé conserve les pics tout en restant proportionnel à la largeur
+        de la figure plutôt qu'au nombre de jours.
+        
+        Args:
+            x: Abscisses (tableau numpy, ex. dates)
+            y: Valeurs numériques (tableau numpy)
+            target: Nombre d'intervalles conservés
+            
+        Returns:
+            tuple: (x, bas, haut) ; bas et haut sont le même tableau si la
+            série n'a pas été réduite
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if len(y) <= 2 * target:
+            return x, y, y
+        
+        starts = np.linspace(0, len(y), target + 1).astype(int)[:-1]
+        mins = np.minimum.reduceat(y, starts)
+        maxs = np.maximum.reduceat(y, starts)
+        return x[starts], mins, maxs
+    
+    @classmethod
+    def _plot_series(cls, ax, x, y, **kwargs):
+        """
+        Trace une série en ligne, ou en bande min/max si elle a été réduite.
+        
+        Args:
+            ax: Axe matplotlib
+            x: Abscisses (tableau numpy)
+            y: Valeurs numériques (tableau numpy)
+            **kwargs: Style commun (label, color, linewidth)
+            
+        Returns:
+            tuple: (x, haut) tracés, pour un éventuel remplissage sous la courbe
+        """
+        x, low, high = cls._downsample(x, y)
+        if low is high:
+            ax.plot(x, high, **kwargs)
+        else:
+            ax.fill_between(x, low, high, rasterized=True, **kwargs)
+        return x, high
     
     def plot_inventory_levels(self, product, days=30, save_path=None):
         """
@@ -45,43 +285,52 @@ class Visualizer:
             save_path: Chemin pour sauvegarder le graphique
         """
         if not PLOT_AVAILABLE:
-            print("❌ Visualisation non disponible (matplotlib manquant)")
+            log.warning("Visualisation non disponible (matplotlib manquant)")
             return
         
-        df = self.db.get_inventory_data(product, period_days=days)
+        df = self._load_plot_data(product, days)
         
         if len(df) == 0:
-            print(f"❌ Pas de données pour {product}")
+            log.warning("Pas de données pour %s", product)
             return
         
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8))
+        fig, (ax1, ax2) = self._get_fig('inventory', 2, (14, 8))
         
-        # Graphique des stocks
-        ax1.plot(df['date'], df['current_stock_level'], 
-                label='Niveau de stock', linewidth=2, color='#3b82f6')
-        ax1.fill_between(df['date'], df['current_stock_level'], 
-                         alpha=0.3, color='#3b82f6')
-        ax1.set_title(f'Évolution du Stock - {product} 🤗', fontsize=14, fontweight='bold')
+        # Graphique des stocks (réduit à la résolution de la figure sur les périodes longues)
+        stock_x, stock_y = self._plot_series(
+            ax1, mdates.date2num(df['date'].to_numpy()), df['current_stock_level'].to_numpy(),
+            label='Niveau de stock', linewidth=2, color=_BLUE)
+        ax1.fill_between(stock_x, stock_y, 
+                         alpha=0.3, color=_BLUE, rasterized=True)
+        ax1.xaxis_date()
+        ax1.set_title(f'Évolution du Stock - {product}', fontsize=14, fontweight='bold')
         ax1.set_ylabel('Stock (unités)', fontsize=12)
         ax1.grid(True, alpha=0.3)
         ax1.legend()
         
-        # Graphique des ventes
-        ax2.bar(df['date'], df['daily_sold_units'], 
-               label='Ventes quotidiennes', color='#10b981', alpha=0.7)
+        # Graphique des ventes : une valeur par jour (max, comme les barres superposées)
+        daily = df.groupby('date', sort=True)['daily_sold_units'].max()
+        day_nums = mdates.date2num(daily.index.to_numpy())
+        sales_x, _, sales_max = self._downsample(day_nums, daily.to_numpy())
+        if len(sales_x) < len(day_nums):
+            # Périodes longues : aire sous le maximum de chaque intervalle de jours
+            ax2.fill_between(sales_x, sales_max,
+                             label='Ventes quotidiennes', color=_GREEN, alpha=0.7,
+                             rasterized=True)
+        else:
+            # Un seul artiste en escalier
+            edges = np.append(day_nums - 0.5, day_nums[-1] + 0.5)
+            ax2.stairs(sales_max, edges, fill=True,
+                       label='Ventes quotidiennes', color=_GREEN, alpha=0.7,
+                       rasterized=True)
+        ax2.xaxis_date()
         ax2.set_title('Ventes Quotidiennes', fontsize=14, fontweight='bold')
         ax2.set_xlabel('Date', fontsize=12)
         ax2.set_ylabel('Unités vendues', fontsize=12)
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        plt.tight_layout()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 Graphique sauvegardé: {save_path}")
-        
-        plt.show()
+        self._finish(fig, save_path)
     
     def plot_weekly_demand_forecast(self, product, horizon=14, method='prophet', save_path=None):
         """
@@ -95,23 +344,23 @@ class Visualizer:
             save_path: Chemin pour sauvegarder
         """
         if not PLOT_AVAILABLE:
-            print("❌ Visualisation non disponible")
+            log.warning("Visualisation non disponible")
             return
         
-        print("\n🔄 Génération du graphique hebdomadaire...")
+        log.info("Génération du graphique hebdomadaire")
         
         # Données historiques sur 8 semaines
-        historical = self.db.get_inventory_data(product, period_days=56)
+        historical = self._load_plot_data(product, 56)
         
         # Prévisions
-        forecast = self.analysis.forecast_demand(product, horizon, method)
+        forecast, method_used = self._get_forecast(product, horizon, method)
         
         if forecast is None or len(historical) == 0:
-            print("❌ Pas assez de données")
+            log.warning("Pas assez de données pour %s", product)
             return
         
         # ========== AGRÉGATION PAR SEMAINE ==========
-        print("📊 Agrégation des données par semaine...")
+        log.info("Agrégation des données par semaine")
         
         # Historique
         hist_copy = historical.copy()
@@ -132,20 +381,20 @@ class Visualizer:
         weekly_fore['type'] = 'Prévision'
         
         # ========== GRAPHIQUE ==========
-        fig, ax = plt.subplots(figsize=(18, 9))
+        fig, ax = self._get_fig('weekly', figsize=(18, 9))
         
         # Barres historiques (bleu)
         x_hist = np.arange(len(weekly_hist))
         bars_hist = ax.bar(x_hist, weekly_hist['units'], 
-                          width=0.7, alpha=0.8, color='#3b82f6', 
-                          label='📊 Ventes hebdomadaires (historique)',
+                          width=0.7, alpha=0.8, color=_BLUE, 
+                          label='Ventes hebdomadaires (historique)',
                           edgecolor='black', linewidth=1.5)
         
         # Barres prévisions (violet)
         x_fore = np.arange(len(weekly_hist), len(weekly_hist) + len(weekly_fore))
         bars_fore = ax.bar(x_fore, weekly_fore['units'], 
-                          width=0.7, alpha=0.8, color='#8b5cf6', 
-                          label='🔮 Prévisions hebdomadaires',
+                          width=0.7, alpha=0.8, color=_PURPLE, 
+                          label='Prévisions hebdomadaires',
                           edgecolor='black', linewidth=1.5)
         
         # Valeurs au-dessus des barres
@@ -162,23 +411,23 @@ class Visualizer:
             z = np.polyfit(x_hist, weekly_hist['units'], 1)
             p = np.poly1d(z)
             ax.plot(x_hist, p(x_hist), 
-                   color='#1e40af', linewidth=3, linestyle='--', alpha=0.7,
+                   color=_DARK_BLUE, linewidth=3, linestyle='--', alpha=0.7,
                    label=f'Tendance historique')
         
         # Moyenne historique
         avg_hist = weekly_hist['units'].mean()
-        ax.axhline(y=avg_hist, color='#059669', linestyle='--', linewidth=2.5,
+        ax.axhline(y=avg_hist, color=_DARK_GREEN, linestyle='--', linewidth=2.5,
                   label=f'Moyenne historique: {avg_hist:.0f} unités/semaine', alpha=0.7)
         
         # Séparation visuelle
         separation = len(weekly_hist) - 0.5
-        ax.axvline(x=separation, color='#dc2626', linestyle=':', linewidth=3, alpha=0.7,
+        ax.axvline(x=separation, color=_RED, linestyle=':', linewidth=3, alpha=0.7,
                   label='➤ Aujourd\'hui')
         
         # Zones colorées
-        ax.axvspan(-0.5, separation, alpha=0.08, color='#3b82f6', zorder=0)
+        ax.axvspan(-0.5, separation, alpha=0.08, color=_BLUE, zorder=0)
         ax.axvspan(separation, len(weekly_hist) + len(weekly_fore) - 0.5, 
-                  alpha=0.08, color='#8b5cf6', zorder=0)
+                  alpha=0.08, color=_PURPLE, zorder=0)
         
         # ========== LABELS ET TITRE ==========
         # Créer les labels de semaines
@@ -189,7 +438,7 @@ class Visualizer:
         ax.set_xticks(range(len(all_weeks)))
         ax.set_xticklabels(week_labels, fontsize=11)
         
-        ax.set_title(f'📊 Demande Hebdomadaire - {product}', 
+        ax.set_title(f'Demande Hebdomadaire - {product}', 
                     fontsize=20, fontweight='bold', pad=25)
         ax.set_xlabel('Semaine (date de début)', fontsize=14, fontweight='bold')
         ax.set_ylabel('Unités vendues (total semaine)', fontsize=14, fontweight='bold')
@@ -197,7 +446,7 @@ class Visualizer:
         # Légende
         legend = ax.legend(fontsize=13, loc='upper left', framealpha=0.95,
                           shadow=True, fancybox=True)
-        legend.get_frame().set_facecolor('#f8f9fa')
+        legend.get_frame().set_facecolor(_LIGHT_GRAY)
         
         # Grille
         ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.8, axis='y')
@@ -210,24 +459,21 @@ class Visualizer:
         variation = ((weekly_fore['units'].mean() - avg_hist) / avg_hist * 100) if avg_hist > 0 else 0
         
         stats_text = (
-            f"📊 Historique: {total_hist:.0f} unités ({len(weekly_hist)} semaines) | "
-            f"🔮 Prévisions: {total_fore:.0f} unités ({len(weekly_fore)} semaines) | "
-            f"📈 Variation attendue: {variation:+.1f}%"
+            f"Historique: {total_hist:.0f} unités ({len(weekly_hist)} semaines) | "
+            f"Prévisions: {total_fore:.0f} unités ({len(weekly_fore)} semaines) | "
+            f"Variation attendue: {variation:+.1f}%"
         )
         
         fig.text(0.5, 0.01, stats_text, ha='center', fontsize=12, 
                 style='italic', weight='bold',
-                bbox=dict(boxstyle='round,pad=0.8', facecolor='#e0e7ff', 
-                         alpha=0.8, edgecolor='#6366f1', linewidth=2))
-        
-        plt.tight_layout(rect=[0, 0.03, 1, 1])
+                bbox=dict(boxstyle='round,pad=0.8', facecolor=_LIGHT_INDIGO, 
+                         alpha=0.8, edgecolor=_INDIGO, linewidth=2))
         
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='white')
-            print(f"💾 Graphique sauvegardé: {save_path}")
+        # Réserver le bas de la figure au texte de synthèse
+        fig.get_layout_engine().set(rect=(0, 0.05, 1, 0.95))
         
-        print("✅ Graphique généré avec succès!")
-        plt.show()
+        log.info("Graphique hebdomadaire généré pour %s", product)
+        self._finish(fig, save_path, facecolor='white')
     
     def plot_demand_forecast(self, product, horizon=14, method='hf_enhanced', save_path=None):
         """
@@ -239,43 +485,45 @@ class Visualizer:
             method: Méthode de prévision
             save_path: Chemin pour sauvegarder le graphique
         """
-        historical = self.db.get_inventory_data(product, period_days=30)
-        forecast = self.analysis.forecast_demand(product, horizon, method)
+        historical = self._load_plot_data(product, 30)
+        forecast, method_used = self._get_forecast(product, horizon, method)
         
         if forecast is None:
             return
         
-        fig, ax = plt.subplots(figsize=(14, 6))
+        fig, ax = self._get_fig('forecast', figsize=(14, 6))
         
         # Ventes réelles
-        ax.plot(historical['date'], historical['daily_sold_units'], 
-               label='Ventes réelles', linewidth=2, color='#3b82f6', marker='o')
+        # Tableaux typés extraits une seule fois
+        hist_x = mdates.date2num(historical['date'].to_numpy())
+        hist_y = historical['daily_sold_units'].to_numpy(dtype=np.float32)
+        forecast_x = mdates.date2num(forecast['date'].to_numpy())
+        pred = forecast['predicted_demand'].to_numpy(dtype=np.float32)
+        lower = forecast['lower_bound'].to_numpy(dtype=np.float32)
+        upper = forecast['upper_bound'].to_numpy(dtype=np.float32)
+        
+        ax.plot(hist_x, hist_y, 
+               label='Ventes réelles', linewidth=2, color=_BLUE, marker='o')
         
         # Prévisions
-        ax.plot(forecast['date'], forecast['predicted_demand'], 
-               label=f'Prévisions ({forecast["method"].iloc[0]})', linewidth=2, 
-               color='#8b5cf6', linestyle='--', marker='s')
+        ax.plot(forecast_x, pred, 
+               label=f'Prévisions ({method_used})', linewidth=2, 
+               color=_PURPLE, linestyle='--', marker='s')
         
         # Intervalle de confiance
-        ax.fill_between(forecast['date'], 
-                       forecast['lower_bound'], 
-                       forecast['upper_bound'],
-                       alpha=0.2, color='#8b5cf6', label='Intervalle de confiance')
+        ax.fill_between(forecast_x, lower, upper,
+                       alpha=0.2, color=_PURPLE, label='Intervalle de confiance',
+                       rasterized=True)
         
-        ax.set_title(f'Prévisions de Demande - {product} 🤗', 
+        ax.xaxis_date()
+        ax.set_title(f'Prévisions de Demande - {product}', 
                     fontsize=14, fontweight='bold')
         ax.set_xlabel('Date', fontsize=12)
         ax.set_ylabel('Unités', fontsize=12)
         ax.legend()
         ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 Graphique sauvegardé: {save_path}")
-        
-        plt.show()
+        self._finish(fig, save_path)
     
     def plot_anomalies(self, product=None, save_path=None):
         """
@@ -285,81 +533,94 @@ class Visualizer:
             product: Produit à analyser (None pour tous)
             save_path: Chemin pour sauvegarder le graphique
         """
-        df = self.db.get_inventory_data(product, period_days=60)
-        anomalies = self.analysis.detect_stock_anomalies(product)
+        anomalies = self._get_anomalies(product)
         
         if anomalies is None or len(anomalies) == 0:
-            print("Aucune anomalie à afficher")
+            log.info("Aucune anomalie à afficher")
             return
         
-        fig, ax = plt.subplots(figsize=(14, 6))
+        # Fenêtre de détection complète (déjà en cache) comme contexte des anomalies
+        df = self._load_plot_data(product, 60)
+        
+        fig, ax = self._get_fig('anomalies', figsize=(14, 6))
         
         # Ligne de stock
-        ax.plot(df['date'], df['current_stock_level'], 
-               linewidth=2, color='#3b82f6', label='Stock')
-        
-        # Marqueurs d'anomalies
-        severity_colors = {
-            'critical': '#ef4444',
-            'danger': '#f97316',
-            'warning': '#eab308'
-        }
-        
-        for severity, color in severity_colors.items():
-            anom = anomalies[anomalies['severity'] == severity]
-            if len(anom) > 0:
-                ax.scatter(anom['date'], anom['stock_level'], 
-                          s=150, color=color, marker='X', 
-                          label=f'{severity.capitalize()}', zorder=5, 
-                          edgecolors='black', linewidths=1.5)
-        
-        ax.set_title('Détection des Anomalies de Stock 🤗', fontsize=14, fontweight='bold')
+        self._plot_series(ax, mdates.date2num(df['date'].to_numpy()),
+                          df['current_stock_level'].to_numpy(),
+                          linewidth=2, color=_BLUE, label='Stock')
+        
+        # Marqueurs d'anomalies : un seul nuage de points, couleur RGBA par ligne
+        codes = pd.Categorical(anomalies['severity'], categories=list(_SEV)).codes
+        marked = codes >= 0
+        palette = np.array(list(_SEV.values()))
+        ax.scatter(mdates.date2num(anomalies['date'].to_numpy()[marked]), anomalies['stock_level'].to_numpy()[marked], 
+                  s=150, c=palette[codes[marked]], marker='X', zorder=5, 
+                  edgecolors='black', linewidths=1.5)
+        
+        # Légende : un marqueur factice par sévérité présente
+        from matplotlib.lines import Line2D
+        present = set(anomalies['severity'])
+        handles = ax.get_legend_handles_labels()[0] + [
+            Line2D([0], [0], marker='X', linestyle='', markersize=12, 
+                   markerfacecolor=color, markeredgecolor='black', markeredgewidth=1.5,
+                   label=severity.capitalize())
+            for severity, color in _SEV.items() if severity in present
+        ]
+        
+        ax.xaxis_date()
+        ax.set_title('Détection des Anomalies de Stock', fontsize=14, fontweight='bold')
         ax.set_xlabel('Date', fontsize=12)
         ax.set_ylabel('Niveau de stock', fontsize=12)
-        ax.legend()
+        ax.legend(handles=handles)
         ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 Graphique sauvegardé: {save_path}")
-        
-        plt.show()
+        self._finish(fig, save_path)
     
     def plot_product_comparison(self, products=None, metric='daily_sold_units', save_path=None):
         """
         Compare plusieurs produits.
         
         Args:
-            products: Liste de produits (None pour top 5)
+            products: Liste de produits (None pour les 5 premiers selon la métrique)
             metric: Métrique à comparer
             save_path: Chemin pour sauvegarder
         """
         if products is None:
-            all_products = self.db.get_all_products()
-            products = all_products[:5]
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        for product in products:
-            df = self.db.get_inventory_data(product, period_days=30)
-            if len(df) > 0:
-                ax.plot(df['date'], df[metric], label=product, linewidth=2, marker='o')
+            products = self.db.get_top_products(metric=metric, n=5, period_days=30)
+        
+        fig, ax = self._get_fig('comparison', figsize=(12, 6))
+        
+        # Une seule extraction pour tous les produits, puis un tracé par groupe
+        data = self._coerce(self.db.get_inventory_data_multi(products, period_days=30))
+        groups = list(data.groupby('Product type', sort=False, observed=True))
+        legend_handles = None
+        
+        if len(groups) > 8:
+            # Nombreux produits : une seule collection au lieu d'un Line2D par produit
+            from matplotlib.collections import LineCollection
+            from matplotlib.lines import Line2D
+            
+            colors = plt.cm.tab20(np.linspace(0, 1, len(groups)))
+            segments = [
+                np.column_stack([mdates.date2num(df['date'].to_numpy()), df[metric].to_numpy(dtype=float)])
+                for _, df in groups
+            ]
+            ax.add_collection(LineCollection(segments, colors=colors, linewidths=2))
+            ax.autoscale()
+            ax.xaxis_date()
+            legend_handles = [Line2D([0], [0], color=color, linewidth=2, label=product)
+                              for (product, _), color in zip(groups, colors)]
+        else:
+            for product, df in groups:
+                ax.plot(df['date'].to_numpy(), df[metric].to_numpy(), label=product, linewidth=2, marker='o')
         
         ax.set_title(f'Comparaison des Produits - {metric}', fontsize=14, fontweight='bold')
         ax.set_xlabel('Date', fontsize=12)
         ax.set_ylabel(metric.replace('_', ' ').title(), fontsize=12)
-        ax.legend()
+        ax.legend(handles=legend_handles)
         ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 Graphique sauvegardé: {save_path}")
-        
-        plt.show()
+        self._finish(fig, save_path)
     
     def plot_restock_urgency(self, restock_plan, save_path=None):
         """
@@ -369,19 +630,14 @@ class Visualizer:
             restock_plan: DataFrame du plan de réappro
             save_path: Chemin pour sauvegarder
         """
-        urgency_colors = {
-            'urgent': '#ef4444',
-            'high': '#f97316',
-            'normal': '#10b981',
-            'low': '#3b82f6'
-        }
-        
-        fig, ax = plt.subplots(figsize=(12, 8))
+        fig, ax = self._get_fig('restock', figsize=(12, 8))
         
-        # Trier par jours de stock
-        plot_data = restock_plan.sort_values('days_of_stock').head(15)
+        # Les 15 produits avec le moins de jours de stock (sans trier tout le plan)
+        plot_data = restock_plan.nsmallest(15, 'days_of_stock')
         
-        colors = [urgency_colors.get(u, '#gray') for u in plot_data['urgency']]
+        # Couleurs RGBA par code d'urgence (code -1 = inconnue -> dernière ligne, gris)
+        codes = pd.Categorical(plot_data['urgency'], categories=list(_URG)).codes
+        colors = np.array(list(_URG.values()) + [_GRAY])[codes]
         
         ax.barh(plot_data['product'], plot_data['days_of_stock'], color=colors)
         ax.set_xlabel('Jours de stock restants', fontsize=12)
@@ -392,13 +648,7 @@ class Visualizer:
         # Légende
         from matplotlib.patches import Patch
         legend_elements = [Patch(facecolor=color, label=urg.capitalize()) 
-                          for urg, color in urgency_colors.items()]
+                          for urg, color in _URG.items()]
         ax.legend(handles=legend_elements, loc='lower right')
         
-        plt.tight_layout()
-        
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"💾 Graphique sauvegardé: {save_path}")
-        
-        plt.show()
\ No newline at end of file
+        self._finish(fig, save_path)
\ No newline at end of file